@@ -28,6 +28,7 @@ from .manager import (
     RuntimeDependencyManagerException,
     DependentPackageNotFoundError,
     VersionCompatibilityError,
+    ImportSpec,
     Package,
     ImportFrom,
     RuntimeDependencyManager
@@ -37,6 +38,7 @@ __all__ = [
     'RuntimeDependencyManagerException',
     'DependentPackageNotFoundError',
     'VersionCompatibilityError',
+    'ImportSpec',
     'Package',
     'ImportFrom',
     'RuntimeDependencyManager'
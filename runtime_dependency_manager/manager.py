@@ -40,23 +40,166 @@ with RuntimeDependencyManager(install_if_missing=True) as mgr:
 
 from __future__ import annotations
 
+import functools
+import hashlib
 import importlib
-import inspect
+import importlib.util
+import json
 import logging
+import os
+import re
 import shlex
 import subprocess
 import sys
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from importlib.metadata import version, PackageNotFoundError
-from packaging.requirements import Requirement
+from importlib.metadata import PackageNotFoundError, distributions, requires
+from itertools import chain
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.specifiers import SpecifierSet
+from packaging.utils import canonicalize_name
 from packaging.version import Version, InvalidVersion
-from typing import Optional
+from types import ModuleType
+from typing import Any, NamedTuple, Optional
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+# logging is left for the application to configure
 logger = logging.getLogger(__name__)
 
+# maximum number of threads used to probe for available modules
+MAX_PROBE_WORKERS = 8
+
+# number of trailing lines of pip output kept for error reporting
+PIP_OUTPUT_TAIL_LINES = 200
+
+@functools.lru_cache(maxsize=None)
+def _is_module_available(module_name: str) -> bool:
+    """
+    Checks if a module can be found, without actually importing (executing) it. Results
+    are memoized, as many imports share the same module; call cache_clear() after
+    modifying the environment.
+
+    Args:
+        module_name (str): The fully qualified name of the module.
+
+    Returns:
+        bool: True if the module can be found, False otherwise.
+    """
+    logger.debug('_is_module_available: %s', module_name)
+
+    if module_name in sys.modules:
+        # already imported, so there's nothing to look up; None marks a blocked import
+        return sys.modules[module_name] is not None
+
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except ValueError:
+        # already imported (e.g., by its parent package), but without a __spec__; anything
+        # else was raised by a parent package's code, which therefore can't be imported
+        module = sys.modules.get(module_name)
+        return module is not None and getattr(module, '__spec__', None) is None
+    except Exception:
+        # a parent package of a dotted module name is missing, or failed to import
+        return False
+
+@functools.lru_cache(maxsize=None)
+def _is_attribute_available(module_name: str, name: str) -> bool:
+    """
+    Checks if a name can be imported from a module. Unlike _is_module_available, this has
+    to import (execute) the module. Results are memoized; call cache_clear() after
+    modifying the environment.
+
+    Args:
+        module_name (str): The fully qualified name of the module.
+        name (str): The name of the attribute, or submodule, to import from the module.
+
+    Returns:
+        bool: True if the name can be imported from the module, False otherwise.
+    """
+    logger.debug('_is_attribute_available: %s from %s', name, module_name)
+
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError:
+        return False
+
+    return hasattr(module, name) or _is_module_available(f'{module_name}.{name}')
+
+def _get_path_mtimes() -> list[Optional[int]]:
+    """
+    Returns the modification times of the sys.path entries, which change whenever packages
+    are installed into, or removed from, any of them (site-packages, user site-packages,
+    PYTHONPATH directories, ...).
+
+    Returns:
+        list[Optional[int]]: The modification times, in nanoseconds, by sys.path entry; None
+                             for entries that don't exist (yet).
+    """
+    mtimes: list[Optional[int]] = []
+    for path in sys.path:
+        try:
+            # '' stands for the current directory
+            mtimes.append(os.stat(path or os.curdir).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return mtimes
+
+@functools.lru_cache(maxsize=256)
+def _parse_specifier(version_spec: str) -> SpecifierSet:
+    """
+    Parses a version specification, sharing the result between packages with identical
+    specifications.
+
+    Args:
+        version_spec (str): The version specification to parse.
+
+    Returns:
+        SpecifierSet: The parsed version specification.
+    """
+    return SpecifierSet(version_spec)
+
+@functools.lru_cache(maxsize=256)
+def _parse_version(installed_version: str) -> Version:
+    """
+    Parses a version string, memoizing the result for repeated checks.
+
+    Args:
+        installed_version (str): The version string to parse.
+
+    Returns:
+        Version: The parsed version.
+    """
+    return Version(installed_version)
+
+def _parse_dist_info_name(path: Any) -> tuple[Optional[str], Optional[str]]:
+    """
+    Parses the name and version of a distribution from the name of its metadata directory,
+    as written by wheel installs (e.g., 'typing_extensions-4.12.2.dist-info').
+
+    Args:
+        path (Any): The path of the distribution's metadata directory, if known.
+
+    Returns:
+        tuple[Optional[str], Optional[str]]: The name and version, or (None, None) if they
+                                             can't be parsed from the directory name.
+    """
+    dir_name = getattr(path, 'name', '')
+    if not dir_name.endswith('.dist-info'):
+        return None, None
+
+    # '-' is escaped in both the name and the version, so it only separates the two
+    name, sep, version = dir_name[:-len('.dist-info')].partition('-')
+    if not name or not sep or '-' in version:
+        return None, None
+
+    try:
+        _parse_version(version)
+    except InvalidVersion:
+        return None, None
+
+    return name, version
+
 class RuntimeDependencyManagerException(Exception):
     """Base exception for RuntimeDependencyManager."""
     pass
@@ -76,6 +219,76 @@ class PackageInstallationError(Exception):
     def __init__(self, message):
         super().__init__(message)
 
+class ImportSpec(NamedTuple):
+    """
+    Represents a single import statement.
+
+    Attributes:
+        kind (str): Either 'import' (import module) or 'from' (from from_name import module).
+        module (str): The name of the module, or item, to import.
+        from_name (str): The module name to import from, for 'from' imports.
+        alias (str): The name to bind the import to, if any.
+    """
+    kind: str
+    module: str
+    from_name: str = ''
+    alias: str = ''
+
+    @property
+    def source_module(self) -> str:
+        """The name of the module that has to be imported for this statement."""
+        return self.from_name if self.kind == 'from' else self.module
+
+    @property
+    def bound_name(self) -> str:
+        """The name this statement binds the import to."""
+        if self.alias or self.kind == 'from':
+            return self.alias or self.module
+        # like 'import a.b', which binds the top-level package 'a'
+        return self.module.partition('.')[0]
+
+class _LazyModule:
+    """
+    Stands in for a module of an optional package that wasn't available, importing it on
+    first use instead. If it's still not available, the placeholder is falsy, and attribute
+    access raises the (cached) ImportError.
+    """
+    __slots__ = ('_name', '_bound_name', '_module', '_error')
+
+    def __init__(self, imp: ImportSpec):
+        self._name = imp.source_module
+        # 'import a.b' (without an alias) stands in for the top-level package 'a'
+        self._bound_name = imp.source_module if imp.alias else imp.bound_name
+        self._module: Optional[ModuleType] = None
+        self._error: Optional[ImportError] = None
+
+    def _load(self) -> Optional[ModuleType]:
+        # a failed import is only attempted once
+        if self._module is None and self._error is None:
+            try:
+                importlib.import_module(self._name)
+                self._module = sys.modules[self._bound_name]
+            except ImportError as e:
+                self._error = e
+        return self._module
+
+    def __bool__(self) -> bool:
+        return self._load() is not None
+
+    def __getattr__(self, name: str) -> Any:
+        # special names are looked up by introspection (hasattr(), copy, doctest, ...), and
+        # slots are only missing on copies, which skip __init__; neither warrants an import
+        if (name.startswith('__') and name.endswith('__')) or name in _LazyModule.__slots__:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        module = self._load()
+        if module is None:
+            raise self._error.with_traceback(None) # type: ignore
+        return getattr(module, name)
+
+    def __repr__(self) -> str:
+        return f"<lazy module '{self._bound_name}'>"
+
 class Package:
     """
     Represents a package with its name, version specification, and import statements.
@@ -84,13 +297,20 @@ class Package:
         name (str): The name of the package.
         version_spec (Optional[str]): The version specification of the package.
         optional (bool): Indicates if the package is optional.
-        imports (list[dict]): List of import statements for the package.
+        imports (list[ImportSpec]): List of import statements for the package.
     """
     def __init__(self, name: str, version_spec: Optional[str] = None, optional: bool = False):
         self.name = name
-        self.version_spec = str(Requirement(f'pkgname{version_spec or ">0"}').specifier) # normalize
+        # normalized (and interned) once here, for matching against installed distributions
+        # and pip output
+        self._canonical = sys.intern(canonicalize_name(name))
+        # parsed once here, and reused for every version check
+        self._specifier = _parse_specifier(version_spec or '>0')
+        self.version_spec = str(self._specifier) # normalize
+        # the requirement as passed to pip
+        self._requirement = f"{name}{self.version_spec}"
         self.optional = optional
-        self.imports: list[dict] = []
+        self.imports: list[ImportSpec] = []
 
     def import_module(self, module_name: str) -> Package:
         """
@@ -102,7 +322,9 @@ class Package:
         Returns:
             Package: The current package instance for chaining.
         """
-        self.imports.append({'type': 'import', 'module': module_name})
+        # module names are interned, as they're used as keys for sys.modules (and the
+        # probe caches) over and over
+        self.imports.append(ImportSpec('import', sys.intern(module_name)))
         return self
 
     def import_modules(self, *modules: str) -> Package:
@@ -115,8 +337,7 @@ class Package:
         Returns:
             Package: The current package instance for chaining.
         """
-        for module_name in modules:
-            self.import_module(module_name)
+        self.imports.extend(ImportSpec('import', sys.intern(module_name)) for module_name in modules)
         return self
 
     def from_module(self, from_name: str) -> ImportFrom:
@@ -142,7 +363,7 @@ class Package:
             Package: The current package instance for chaining.
         """
         if self.imports:
-            self.imports[-1]['alias'] = alias
+            self.imports[-1] = self.imports[-1]._replace(alias=alias)
         return self
 
     def __enter__(self) -> Package:
@@ -160,7 +381,7 @@ class ImportFrom:
         package (Package): The package instance that this import belongs to.
     """
     def __init__(self, from_name: str, package: Package):
-        self.from_name = from_name
+        self.from_name = sys.intern(from_name)
         self.package = package
 
     def import_module(self, module_name: str) -> Package:
@@ -173,7 +394,7 @@ class ImportFrom:
         Returns:
             Package: The package instance for chaining.
         """
-        self.package.imports.append({'type': 'from', 'from': self.from_name, 'module': module_name})
+        self.package.imports.append(ImportSpec('from', sys.intern(module_name), self.from_name))
         return self.package
 
     def import_modules(self, *modules: str) -> Package:
@@ -186,8 +407,7 @@ class ImportFrom:
         Returns:
             Package: The package instance for chaining.
         """
-        for module_name in modules:
-            self.import_module(module_name)
+        self.package.imports.extend(ImportSpec('from', sys.intern(module_name), self.from_name) for module_name in modules)
         return self.package
 
 class RuntimeDependencyManager:
@@ -200,28 +420,60 @@ class RuntimeDependencyManager:
         index_url (Optional[str]): The base URL of the Python Package Index.
         extra_index_urls (Optional[list[str]]): Additional URLs of package indexes.
         trusted_hosts (Optional[list[str]]): List of trusted hosts.
+        install_workers (int): Number of concurrent pip invocations to split installs across.
+        strict_imports (bool): Whether to verify that names imported with from_module() exist,
+                               which requires importing their modules when probing.
+        cache_dir (Optional[str]): Directory to remember, across runs, that all packages are
+                                   available in, for checking missing_packages without
+                                   installing; disabled if not set.
+        find_links (Optional[list[str]]): Local directories (or URLs) to look for packages in.
+        prefer_offline (bool): Whether to first try installing from find_links only, without
+                               using any package index.
+        import_workers (int): Number of threads to import independent top-level packages with.
+        caller_globals (Optional[dict[str, Any]]): The globals to bind imports in; defaults to
+                                                   the globals of the module creating the manager.
     """
     def __init__(
         self, 
         install_if_missing: bool = False,
         index_url: Optional[str] = None,
         extra_index_urls: Optional[list[str]] = None,
-        trusted_hosts: Optional[list[str]] = None
+        trusted_hosts: Optional[list[str]] = None,
+        install_workers: int = 1,
+        strict_imports: bool = False,
+        cache_dir: Optional[str] = None,
+        find_links: Optional[list[str]] = None,
+        prefer_offline: bool = False,
+        import_workers: int = 1,
+        caller_globals: Optional[dict[str, Any]] = None
     ):
-        # use the callers reference to globals for importing modules
-        self.caller_globals = inspect.currentframe().f_back.f_globals # type: ignore
+        # use the callers reference to globals for importing modules, unless given explicitly
+        # (e.g., by a helper creating managers on behalf of another module)
+        self.caller_globals = sys._getframe(1).f_globals if caller_globals is None else caller_globals
 
         self.packages: list[Package] = []
         self.install_if_missing = bool(install_if_missing)
         self.index_url = index_url
         self.extra_index_urls = extra_index_urls or []
         self.trusted_hosts = trusted_hosts or []
-        
+        self.install_workers = install_workers
+        self.strict_imports = bool(strict_imports)
+        self.cache_dir = os.path.expanduser(cache_dir) if cache_dir else None
+        self.find_links = find_links or []
+        self.prefer_offline = bool(prefer_offline)
+        self.import_workers = import_workers
+
+        # snapshot of installed distributions ({canonical name: version}), taken after installing
+        self._dist_cache: Optional[dict[str, str]] = None
+        self._missing_packages_cache: Optional[list[Package]] = None
+        # optional packages found missing when probing, which aren't worth trying to import
+        self._unavailable_optional_packages: set[Package] = set()
+
     @property
     def missing_packages(self) -> list[Package]:
-        if getattr(self, '__missing_packages', None) is None:
-           self.__missing_packages = self._get_missing_packages()
-        return self.__missing_packages
+        if self._missing_packages_cache is None:
+            self._missing_packages_cache = self._get_missing_packages()
+        return self._missing_packages_cache
 
     def __enter__(self) -> RuntimeDependencyManager:
         return self
@@ -231,7 +483,7 @@ class RuntimeDependencyManager:
             self.install()
         elif self.missing_packages:
             for package in self.missing_packages:
-                logger.warning(f"Missing required runtime module: {package.name}{package.version_spec}")
+                logger.warning("Missing required runtime module: %s%s", package.name, package.version_spec)
             sys.exit(1)
      
     def package(self, name: str, version_spec: Optional[str] = None, optional: bool = False) -> Package:
@@ -248,17 +500,71 @@ class RuntimeDependencyManager:
         """
         pkg = Package(name, version_spec, optional)
         self.packages.append(pkg)
+        self._missing_packages_cache = None
         return pkg
 
     def install(self):
         """
         Installs missing packages and imports all modules.
         """
-        if self.missing_packages:
+        retry_packages: Optional[list[Package]] = None
+
+        if self._missing_packages_cache is None:
+            # import optimistically: when nothing is missing (the common case), probing
+            # beforehand would only repeat the lookups the import system does anyway. only
+            # packages that fail to import are probed, and imported again after installing.
+            retry_packages = self._import_all_modules(log_errors=False)
+            if not retry_packages:
+                # nothing was probed, so there's nothing for the probe cache to save either
+                self._missing_packages_cache = []
+                return
+
+            self._missing_packages_cache = self._get_missing_packages(retry_packages)
+
+        installed = bool(self.missing_packages)
+        if installed:
             self._install_missing_packages(self.missing_packages)
-            importlib.invalidate_caches()
+            # pip succeeded and every installed package was found in the distribution snapshot
+            # (or an exception was raised), so there's no need to probe for them again
+            self._missing_packages_cache = []
+
+        failed_packages = self._import_all_modules(retry_packages)
 
-        self._import_all_modules()
+        if installed and self.cache_dir and not failed_packages and not self._unavailable_optional_packages:
+            # everything imports after installing; record the post-install environment, so
+            # the next run can skip probing
+            self._write_probe_cache()
+
+    @classmethod
+    def install_all(cls, *managers: RuntimeDependencyManager):
+        """
+        Installs the missing packages of several managers with a single pip invocation,
+        and imports all of their modules. Package index options are taken from the first
+        manager.
+
+        Args:
+            *managers (RuntimeDependencyManager): The managers to install packages for.
+        """
+        if not managers:
+            return
+
+        seen: set[tuple[str, str]] = set()
+        missing_packages: list[Package] = []
+
+        for mgr in managers:
+            for pkg in mgr.missing_packages:
+                # the same requirement declared by several managers only needs installing once
+                if (pkg._canonical, pkg.version_spec) not in seen:
+                    seen.add((pkg._canonical, pkg.version_spec))
+                    missing_packages.append(pkg)
+
+        if missing_packages:
+            managers[0]._install_missing_packages(missing_packages)
+            for mgr in managers:
+                mgr._missing_packages_cache = []
+
+        for mgr in managers:
+            mgr._import_all_modules()
 
     @contextmanager
     def immediately_install_package(self, *args, module_name: Optional[str] = None, **kwargs):
@@ -274,110 +580,307 @@ class RuntimeDependencyManager:
         else: # only yield if error free
             yield
 
-    def _get_missing_packages(self) -> list[Package]:
+    def _get_missing_packages(self, packages: Optional[list[Package]] = None) -> list[Package]:
         """
         Returns a list of missing packages.
 
+        Args:
+            packages (Optional[list[Package]]): The packages to check; defaults to all packages.
+
         Returns:
             list[Package]: List of missing Package instances.
         """
         missing_packages = []
         optional_missing_packages = []
+        # the probe cache records the availability of all packages, not of a subset of them
+        use_probe_cache = bool(self.cache_dir) and packages is None
+
+        if packages is None:
+            packages = self.packages
+
+        if use_probe_cache and self._is_probe_cache_valid():
+            logger.debug("All packages available, according to the probe cache")
+            return missing_packages
+
+        # packages often share modules (e.g., pymongo and bson), so each distinct import
+        # statement is probed once, no matter how many packages declare it
+        unique_imports = list(dict.fromkeys(imp for pkg in packages for imp in self._get_probed_imports(pkg)))
+
+        if not unique_imports:
+            return missing_packages
+
+        # locating top-level modules only waits on filesystem lookups, so those are located
+        # concurrently (warming _is_module_available's cache), unless there's only one
+        # (e.g., retrying a package that failed to import). locating a dotted module imports
+        # (executes) its parent packages, so that's left to the calling thread.
+        module_names = list(dict.fromkeys(
+            imp.source_module for imp in unique_imports if '.' not in imp.source_module
+        ))
+        if len(module_names) > 1:
+            with ThreadPoolExecutor(max_workers=min(MAX_PROBE_WORKERS, len(module_names))) as executor:
+                list(executor.map(_is_module_available, module_names))
+
+        # the imports themselves are probed on the calling thread, as strict checks import
+        # (execute) modules, whose code may require the main thread (e.g., signal.signal())
+        probe_results = {imp: self._try_import(imp) for imp in unique_imports}
 
-        for pkg in self.packages:
-            if not self._are_imports_available(pkg):
+        for pkg in packages:
+            if not self._are_imports_available(pkg, probe_results):
                 if pkg.optional:
                     optional_missing_packages.append(pkg)
                 else:
                     missing_packages.append(pkg)
 
-        if optional_missing_packages:
+        self._unavailable_optional_packages = set(optional_missing_packages)
+
+        if optional_missing_packages and logger.isEnabledFor(logging.WARNING):
             logger.warning("Optional module not found: %s", ", ".join(pkg.name for pkg in optional_missing_packages))
 
+        if use_probe_cache and not missing_packages and not optional_missing_packages:
+            self._write_probe_cache()
+
         return missing_packages
 
-    def _are_imports_available(self, pkg: Package) -> bool:
+    def _get_probe_cache_path(self) -> str:
+        """
+        Returns the path of the probe cache file for the declared packages and the running
+        interpreter.
+
+        Returns:
+            str: The path of the probe cache file.
+        """
+        declared = [(pkg.name, pkg.version_spec, pkg.optional, pkg.imports) for pkg in self.packages]
+        key = json.dumps([declared, self.strict_imports, sys.prefix, sys.version, sys.path])
+        return os.path.join(self.cache_dir, f"{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}.json") # type: ignore
+
+    def _is_probe_cache_valid(self) -> bool:
+        """
+        Checks if the probe cache records all packages as available, and the environment
+        hasn't changed since.
+
+        Returns:
+            bool: True if probing can be skipped, False otherwise.
+        """
+        try:
+            with open(self._get_probe_cache_path()) as cache_file:
+                cache = json.load(cache_file)
+            return cache.get('all_present') is True and cache.get('path_mtimes') == _get_path_mtimes()
+        except (OSError, ValueError, AttributeError):
+            return False
+
+    def _write_probe_cache(self):
+        """
+        Records in the probe cache that all packages are available.
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True) # type: ignore
+            with open(self._get_probe_cache_path(), 'w') as cache_file:
+                json.dump({'all_present': True, 'path_mtimes': _get_path_mtimes()}, cache_file)
+        except OSError as e:
+            logger.debug("Unable to write probe cache: %s", e)
+
+    def _are_imports_available(self, pkg: Package, probe_results: Optional[dict[ImportSpec, bool]] = None) -> bool:
         """
         Checks if all import statements for a package are available.
 
         Args:
             pkg (Package): The package to check.
+            probe_results (Optional[dict[ImportSpec, bool]]): Results of already probed import
+                                                              statements, by import statement.
 
         Returns:
             bool: True if all imports are available, False otherwise.
         """
-        if pkg.imports:
-            for imp in pkg.imports:
-                if not self._try_import(imp):
-                    return False
-        else:
-            if not self._try_import({"type": "import", "module": pkg.name}):
-                return False
+        if probe_results is None:
+            return all(self._try_import(imp) for imp in self._get_probed_imports(pkg))
+        return all(probe_results[imp] for imp in self._get_probed_imports(pkg))
 
-        return True
+    def _get_probed_imports(self, pkg: Package) -> tuple[ImportSpec, ...]:
+        """
+        Returns the import statements to probe in order to check if a package is available.
 
-    def _try_import(self, imp: dict) -> bool:
+        Args:
+            pkg (Package): The package to check.
+
+        Returns:
+            tuple[ImportSpec, ...]: The import statements, without aliases.
+        """
+        # aliases don't affect availability; dropping them lets identical imports be probed once.
+        # without any import statements, the package is expected to provide a module of the same name
+        return (
+            tuple(imp._replace(alias='') if imp.alias else imp for imp in pkg.imports)
+            or (ImportSpec('import', pkg.name),)
+        )
+
+    def _try_import(self, imp: ImportSpec) -> bool:
         """
-        Tries to import a module and returns True if successful, False otherwise.
+        Checks if a module can be imported, without actually importing (executing) it.
 
         Args:
-            imp (dict): The import statement dictionary.
+            imp (ImportSpec): The import statement.
 
         Returns:
-            bool: True if import is successful, False otherwise.
+            bool: True if the module can be found, False otherwise.
         """
-        try:
-            statement: str = f"import {imp['module']}"
-            
-            if imp['type'] == 'from':
-                statement = f"from {imp['from']} {statement}"
-            
-            if 'alias' in imp:
-                statement = f"{statement} as {imp['alias']}"
-            
-            logger.debug(f'_try_import: {statement}')
-            
-            # we're just checking if the import would work; no need to 
-            # add it to the global scope here
-            exec(statement, {})
-            
-            return True
-        except ImportError:
+        # for 'from' imports, the imported name may be any attribute of the module, which
+        # can't be known without executing it; so unless strict_imports is set, only the
+        # module itself is located here. aliases don't affect availability at all.
+        if not _is_module_available(imp.source_module):
             return False
 
-    def _import_all_modules(self):
+        if self.strict_imports and imp.kind == 'from':
+            return _is_attribute_available(imp.from_name, imp.module)
+
+        return True
+
+    def _import_all_modules(self, packages: Optional[list[Package]] = None, log_errors: bool = True) -> list[Package]:
         """
         Imports all modules specified in the package dependencies.
+
+        Args:
+            packages (Optional[list[Package]]): The packages to import; defaults to all packages.
+            log_errors (bool): Whether to log modules that can't be imported.
+
+        Returns:
+            list[Package]: Packages with modules that couldn't be imported.
+        """
+        if packages is None:
+            packages = self.packages
+
+        if self.import_workers > 1:
+            self._preimport_modules(packages)
+
+        # each distinct module is imported once, however many names are bound from it
+        modules: dict[str, ModuleType] = {}
+        caller_globals = self.caller_globals
+        failed_packages = []
+
+        for pkg in packages:
+            # probing already showed these can't be imported (and warned about them), so their
+            # modules are only imported if, and when, they're used. names already bound by the
+            # caller (e.g., fallbacks) are left as is.
+            if pkg in self._unavailable_optional_packages:
+                for imp in pkg.imports:
+                    if imp.kind == 'import':
+                        caller_globals.setdefault(imp.bound_name, _LazyModule(imp))
+                continue
+
+            if not pkg.imports:
+                # there's nothing to import, but the package is still expected to be present
+                imported = self._are_imports_available(pkg)
+            else:
+                # every import is attempted, so as many names as possible are bound
+                imported = all([self._import_module(pkg, imp, modules, caller_globals, log_errors) for imp in pkg.imports])
+
+            if not imported:
+                failed_packages.append(pkg)
+
+        return failed_packages
+
+    def _preimport_modules(self, packages: list[Package]):
         """
-        for pkg in self.packages:
+        Imports the packages' modules concurrently, grouped by top-level package, ahead of
+        binding them. Errors are left for binding to report.
+
+        Args:
+            packages (list[Package]): The packages to import the modules of.
+        """
+        # submodules of the same top-level package are imported by the same thread, in order,
+        # as they're likely to import one another
+        groups: dict[str, dict[str, None]] = {}
+        for pkg in packages:
+            if pkg in self._unavailable_optional_packages:
+                continue
             for imp in pkg.imports:
-                self._import_module(pkg, imp)
+                module_name = imp.source_module
+                if module_name not in sys.modules:
+                    groups.setdefault(module_name.partition('.')[0], {})[module_name] = None
+
+        if len(groups) < 2:
+            return
+
+        # executing module code holds the GIL, but reading sources, bytecode and extension
+        # modules from disk doesn't, so imports of independent packages overlap their IO
+        with ThreadPoolExecutor(max_workers=min(self.import_workers, len(groups))) as executor:
+            list(executor.map(self._preimport_group, groups.values()))
 
-    def _import_module(self, pkg: Package, imp: dict):
+    def _preimport_group(self, module_names: dict[str, None]):
+        """
+        Imports modules in order, ignoring any errors.
+
+        Args:
+            module_names (dict[str, None]): The names of the modules to import.
+        """
+        for module_name in module_names:
+            try:
+                importlib.import_module(module_name)
+            except Exception:
+                # failed imports are removed from sys.modules, so binding imports them again,
+                # and reports the error
+                pass
+
+    def _import_module(
+        self,
+        pkg: Package,
+        imp: ImportSpec,
+        modules: Optional[dict[str, ModuleType]] = None,
+        caller_globals: Optional[dict[str, Any]] = None,
+        log_errors: bool = True
+    ) -> bool:
         """
         Imports a module based on the import statement.
 
         Args:
-            imp (dict): The import statement dictionary.
+            pkg (Package): The package the import statement belongs to.
+            imp (ImportSpec): The import statement.
+            modules (Optional[dict[str, ModuleType]]): Modules already imported, by name.
+            caller_globals (Optional[dict[str, Any]]): The globals to bind the import in;
+                                                       defaults to the caller's globals.
+            log_errors (bool): Whether to log the import statement if it fails.
+
+        Returns:
+            bool: True if the import succeeded, False otherwise.
         """
+        if modules is None:
+            modules = {}
+        if caller_globals is None:
+            caller_globals = self.caller_globals
+
         try:
-            global_id = imp['alias'] if 'alias' in imp else imp['module']
-            
-            if imp['type'] == 'import':
-                self.caller_globals[global_id] = importlib.import_module(global_id)
-            elif imp['type'] == 'from':
-                self.caller_globals[global_id] = getattr(importlib.import_module(imp['from']), imp['module'])
+            global_id = imp.bound_name
+            module_name = imp.source_module
+
+            if module_name not in modules:
+                # modules imported already (e.g., by earlier scripts, or the package's other
+                # modules) are used as is, bypassing the import machinery
+                modules[module_name] = sys.modules.get(module_name) or importlib.import_module(module_name)
+
+            if imp.kind == 'import':
+                if global_id == module_name or imp.alias:
+                    caller_globals[global_id] = modules[module_name]
+                else:
+                    # importing a submodule imports its top-level package as well
+                    caller_globals[global_id] = sys.modules.get(global_id) or importlib.import_module(global_id)
+            elif imp.kind == 'from':
+                caller_globals[global_id] = getattr(modules[module_name], imp.module)
         except ImportError as e:
-            if imp['type'] == 'import':
-                logger.error("Error importing %s: %s; are you missing from_module('%s') ?", imp['module'], str(e), pkg.name)
-            elif imp['type'] == 'from':
-                logger.error("Error importing %s from %s: %s", imp['module'], imp.get('from', ''), str(e))
+            if not log_errors:
+                return False
+            if imp.kind == 'import':
+                logger.error("Error importing %s: %s; are you missing from_module('%s') ?", imp.module, e, pkg.name)
+            elif imp.kind == 'from':
+                logger.error("Error importing %s from %s: %s", imp.module, imp.from_name, e)
             else:
-                logger.error("Error importing import: %s; %s", imp, str(e))
+                logger.error("Error importing import: %s; %s", imp, e)
+            return False
         except AttributeError as e:
             # this should only happen in the event of a "from module import X" failing because 
             # 'module' doesn't have the requested attribute
-            logger.error("Error importing %s from %s: %s", imp['module'], imp.get('from', ''), str(e))
+            if log_errors:
+                logger.error("Error importing %s from %s: %s", imp.module, imp.from_name, e)
+            return False
+
+        return True
                 
     def _install_missing_packages(self, packages: list[Package]):
         """
@@ -386,73 +889,275 @@ class RuntimeDependencyManager:
         Args:
             packages (list[Package]): List of packages to install.
         """
-        cmd_base = [sys.executable, '-m', 'pip', 'install']
-        
-        if self.index_url:
-            cmd_base.extend(['--index-url', self.index_url])
-            
-        for url in self.extra_index_urls:
-            cmd_base.extend(['--extra-index-url', url])
-            
-        for host in self.trusted_hosts:
-            cmd_base.extend(['--trusted-host', host])
-        
-        for pkg in packages:
-            cmd = cmd_base.copy()
-            cmd.extend([f"{pkg.name}{pkg.version_spec}" if pkg.version_spec else pkg.name])
-            
-            logger.info(f"Installing runtime dependency: {pkg.name} ...")
-
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            logging.debug(f"Running: {' '.join(shlex.quote(arg) for arg in cmd)}")
-            
-            if result.returncode != 0:
-                if 'No matching distribution' in result.stderr:
-                    raise DependentPackageNotFoundError(pkg.name)
-                
-                failed_cmd = ' '.join(shlex.quote(arg) for arg in cmd)
-                logger.error("Error installing package: %s: %s", pkg.name, result.stderr)
-                logger.error("Failed command: %s", failed_cmd)
+        if not packages:
+            # nothing to install, so there's no need to build a command, or start pip
+            return
+
+        cmd_base = self._get_pip_install_command()
+
+        package_names = ', '.join(pkg.name for pkg in packages)
+        logger.info("Installing runtime dependencies: %s ...", package_names)
+
+        # without find_links there's nothing to install from offline, so don't bother trying
+        if self.prefer_offline and self.find_links:
+            # without an index, build dependencies can't be fetched into an isolated build
+            # environment either, so packages are built using the current environment
+            failures = self._run_pip_installs(cmd_base + ['--no-index', '--no-build-isolation'], packages)
+            if failures:
+                logger.info("Unable to install %s offline; retrying using the package index", package_names)
+                failures = self._run_pip_installs(cmd_base, packages)
+        else:
+            failures = self._run_pip_installs(cmd_base, packages)
+
+        for shard, cmd, result in failures:
+            if 'No matching distribution' in result.stdout:
+                raise DependentPackageNotFoundError(self._find_unavailable_package(shard, result.stdout))
+
+        if failures:
+            for shard, cmd, result in failures:
+                logger.error("Error installing packages: %s", ', '.join(pkg.name for pkg in shard))
+                logger.error("Failed command: %s", ' '.join(shlex.quote(arg) for arg in cmd))
                 logger.error("Command output: %s", result.stdout)
-                raise PackageInstallationError(f"Error installing package {pkg.name}")
 
+            failed_names = ', '.join(pkg.name for shard, _, _ in failures for pkg in shard)
+            raise PackageInstallationError(f"Error installing packages {failed_names}")
+
+        # pip has modified the environment, so refresh the import system's finder caches
+        # and take a single snapshot of the installed distributions to verify against
+        importlib.invalidate_caches()
+        _is_module_available.cache_clear()
+        _is_attribute_available.cache_clear()
+        self._dist_cache = self._get_installed_versions()
+
+        for pkg in packages:
             if pkg.version_spec:
-                self._check_version_compatibility(pkg)
+                self._check_version_compatibility(pkg, self._dist_cache)
+
+    def _get_pip_install_command(self) -> list[str]:
+        """
+        Returns the pip install command, including package index options, without any packages.
+
+        Returns:
+            list[str]: The pip install command.
+        """
+        return [
+            sys.executable, '-m', 'pip', 'install',
+            *(['--index-url', self.index_url] if self.index_url else []),
+            *chain.from_iterable(('--extra-index-url', url) for url in self.extra_index_urls),
+            *chain.from_iterable(('--trusted-host', host) for host in self.trusted_hosts),
+            *chain.from_iterable(('--find-links', location) for location in self.find_links),
+        ]
+
+    def _run_pip_installs(
+        self,
+        cmd_base: list[str],
+        packages: list[Package]
+    ) -> list[tuple[list[Package], list[str], subprocess.CompletedProcess]]:
+        """
+        Runs pip install for the given packages.
 
-    def _check_version_compatibility(self, pkg: Package):
+        Args:
+            cmd_base (list[str]): The pip install command, without any packages.
+            packages (list[Package]): List of packages to install.
+
+        Returns:
+            list[tuple[list[Package], list[str], subprocess.CompletedProcess]]: The packages,
+                command and result of each failed pip invocation.
+        """
+        # a single pip invocation lets pip resolve all of the packages at once, instead of
+        # paying for interpreter startup, index scans and dependency resolution per package.
+        # with install_workers > 1, packages are instead split across concurrent pip
+        # invocations, overlapping their downloads.
+        workers = max(1, min(self.install_workers, len(packages)))
+        if workers == 1:
+            shards = [packages]
+        else:
+            shards = self._shard_packages(packages, workers)
+        cmds = [
+            cmd_base + [pkg._requirement for pkg in shard]
+            for shard in shards
+        ]
+
+        if logger.isEnabledFor(logging.DEBUG):
+            for cmd in cmds:
+                logger.debug("Running: %s", ' '.join(shlex.quote(arg) for arg in cmd))
+
+        if len(cmds) == 1:
+            results = [self._run_pip(cmds[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=len(cmds)) as executor:
+                results = list(executor.map(self._run_pip, cmds))
+
+        return [
+            (shard, cmd, result) for shard, cmd, result in zip(shards, cmds, results) if result.returncode != 0
+        ]
+
+    def _shard_packages(self, packages: list[Package], workers: int) -> list[list[Package]]:
+        """
+        Splits packages across pip invocations, keeping packages that depend on one another
+        in the same invocation.
+
+        Args:
+            packages (list[Package]): List of packages to install.
+            workers (int): Maximum number of pip invocations.
+
+        Returns:
+            list[list[Package]]: The packages to install with each pip invocation.
+        """
+        # concurrent pip invocations don't coordinate with each other, so each shard has to
+        # be independently solvable. dependencies can only be read from the metadata of
+        # distributions that are already present (e.g., installed at an incompatible
+        # version); packages that aren't present are treated as independent.
+        index = {pkg._canonical: i for i, pkg in enumerate(packages)}
+        parent = list(range(len(packages)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, pkg in enumerate(packages):
+            try:
+                requirements = requires(pkg.name) or []
+            except PackageNotFoundError:
+                continue
+
+            for requirement in requirements:
+                try:
+                    j = index.get(canonicalize_name(Requirement(requirement).name))
+                except InvalidRequirement:
+                    continue
+                if j is not None:
+                    parent[find(i)] = find(j)
+
+        groups: dict[int, list[Package]] = {}
+        for i, pkg in enumerate(packages):
+            groups.setdefault(find(i), []).append(pkg)
+
+        # largest groups first, each going to the shard with the fewest packages so far
+        shards: list[list[Package]] = [[] for _ in range(workers)]
+        for group in sorted(groups.values(), key=len, reverse=True):
+            min(shards, key=len).extend(group)
+
+        return [shard for shard in shards if shard]
+
+    def _run_pip(self, cmd: list[str]) -> subprocess.CompletedProcess:
+        """
+        Runs a pip command, logging its output as it's produced.
+
+        Args:
+            cmd (list[str]): The pip command to run.
+
+        Returns:
+            subprocess.CompletedProcess: The result of the command; stdout holds the last
+                                         PIP_OUTPUT_TAIL_LINES lines of (combined) output.
+        """
+        # stderr is merged into stdout, as reading two pipes from a single thread can
+        # deadlock once the unread pipe's buffer fills up
+        output: deque[str] = deque(maxlen=PIP_OUTPUT_TAIL_LINES)
+
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1, text=True) as proc:
+            for line in proc.stdout: # type: ignore
+                line = line.rstrip()
+                logger.debug("pip: %s", line)
+                output.append(line)
+
+            returncode = proc.wait()
+
+        return subprocess.CompletedProcess(cmd, returncode, '\n'.join(output))
+
+    def _find_unavailable_package(self, packages: list[Package], output: str) -> str:
+        """
+        Determines which package pip was unable to find a distribution for.
+
+        Args:
+            packages (list[Package]): List of packages that were being installed.
+            output (str): The output of the pip command.
+
+        Returns:
+            str: The name of the unavailable package, or the names of all packages
+                 if it can't be determined from pip's output.
+        """
+        packages_by_name = {pkg._canonical: pkg for pkg in packages}
+
+        for match in re.finditer(r'No matching distribution found for ([A-Za-z0-9._-]+)', output):
+            pkg = packages_by_name.get(canonicalize_name(match.group(1)))
+            if pkg is not None:
+                return pkg.name
+
+        return ', '.join(pkg.name for pkg in packages)
+
+    def _check_version_compatibility(self, pkg: Package, installed_versions: Optional[dict[str, str]] = None):
         """
         Checks if the installed version of a package satisfies the specified version constraints.
 
         Args:
             pkg (Package): The package to check.
+            installed_versions (Optional[dict[str, str]]): Snapshot of installed versions to check
+                                                           against; defaults to the manager's snapshot.
         """
+        if installed_versions is None:
+            if self._dist_cache is None:
+                self._dist_cache = self._get_installed_versions()
+            installed_versions = self._dist_cache
+
+        installed_version = installed_versions.get(pkg._canonical)
+        if installed_version is None:
+            raise DependentPackageNotFoundError(pkg.name)
+
         try:
-            installed_version = version(pkg.name)
-            if not self._is_version_satisfying(installed_version, pkg.version_spec):
+            if not self._is_version_satisfying(installed_version, pkg._specifier):
                 raise VersionCompatibilityError(pkg.name, installed_version, pkg.version_spec)
-        except PackageNotFoundError:
-            raise DependentPackageNotFoundError(pkg.name)
         except VersionCompatibilityError as e:
-            logger.error(str(e))
+            logger.error("%s", e)
             raise e
 
-    def _is_version_satisfying(self, installed_version: str, version_spec: Optional[str]) -> bool:
+    def _get_installed_versions(self) -> dict[str, str]:
+        """
+        Scans the installed distributions once, rather than once per package.
+
+        Returns:
+            dict[str, str]: Mapping of canonicalized distribution name to installed version.
+        """
+        installed_versions: dict[str, str] = {}
+
+        for dist in distributions():
+            # reading the name and version from the directory name avoids reading and parsing
+            # each distribution's METADATA file, which dominates the cost of the scan
+            name, version = _parse_dist_info_name(getattr(dist, '_path', None))
+            if not name:
+                name, version = dist.metadata['Name'], dist.version
+            if name:
+                # like importlib.metadata.version(), the first distribution found on sys.path wins
+                installed_versions.setdefault(canonicalize_name(name), version)
+
+        return installed_versions
+
+    def _is_version_satisfying(self, installed_version: str, specifier: Optional[SpecifierSet]) -> bool:
         """
         Checks if the installed version satisfies the version specification.
 
         Args:
             installed_version (str): The installed version of the package.
-            version_spec (str): The version specification to check against.
+            specifier (Optional[SpecifierSet]): The parsed version specification to check against.
 
         Returns:
             bool: True if the version satisfies the specification, False otherwise.
         """
-        if not version_spec:
+        if not specifier:
             return True
 
+        if len(specifier) == 1:
+            # an exact pin matching the installed version string needs no version parsing;
+            # otherwise (e.g., '==1.0' vs '1.0.0'), versions are compared as usual
+            spec = next(iter(specifier))
+            if spec.operator in ('==', '===') and spec.version == installed_version:
+                return True
+
         try:
-            return Version(installed_version) in Requirement(f"pkgname{version_spec}").specifier
+            # an installed pre-release was explicitly chosen, so it satisfies the specifier
+            return specifier.contains(_parse_version(installed_version), prereleases=True)
         except InvalidVersion:
             logger.error("Invalid version: %s", installed_version)
             return False
@@ -16,22 +16,65 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import contextlib
+import copy
+import importlib
+import io
+import os
 import subprocess
 import sys
+import tempfile
 import types
 import unittest
-from unittest.mock import call, patch, MagicMock
-from importlib.metadata import PackageNotFoundError
+from importlib.metadata import PackageNotFoundError, distributions
+from pathlib import Path
+from unittest.mock import patch
 
 from runtime_dependency_manager.manager import (
     RuntimeDependencyManager, 
     DependentPackageNotFoundError, 
     VersionCompatibilityError, 
+    ImportSpec, 
     Package, 
     ImportFrom, 
-    PackageInstallationError
+    PackageInstallationError,
+    _is_attribute_available,
+    _parse_dist_info_name,
+    _parse_version,
+    _is_module_available
 )
 
+def make_distribution(name, version):
+    return types.SimpleNamespace(metadata={'Name': name}, version=version)
+
+class FakeProcess:
+    # stands in for subprocess.Popen, used as a context manager
+    def __init__(self, returncode, output=''):
+        self.stdout = io.StringIO(output)
+        self.returncode = returncode
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def wait(self):
+        return self.returncode
+
+class FakeModule(types.ModuleType):
+    # stands in for an imported module, providing any name imported from it
+    def __getattr__(self, name):
+        return name
+
+def import_after_install(mock_popen):
+    # modules can only be imported once pip has been run
+    def import_module(name):
+        if not mock_popen.called:
+            raise ImportError(f"No module named '{name}'")
+        return FakeModule(name)
+    return import_module
+
 # Store a reference to the original getattr
 original_getattr = getattr
 
@@ -46,11 +89,25 @@ def custom_getattr(obj, name, default=None):
 
 class TestRuntimeDependencyManager(unittest.TestCase):
 
-    @patch('runtime_dependency_manager.manager.subprocess.run', return_value=subprocess.CompletedProcess((), 0))
-    @patch('runtime_dependency_manager.manager.importlib.import_module', return_value=MagicMock())
-    @patch('runtime_dependency_manager.manager.version', side_effect=['1.1', '3.11.4', '2.7.2','1.0.1'])
-    @patch('runtime_dependency_manager.manager.logger')
-    def test_install_missing_packages(self, mock_logger, mock_version, mock_import_module, mock_run):
+    def setUp(self):
+        # module probes are memoized process-wide; don't leak them between tests
+        _is_module_available.cache_clear()
+        _is_attribute_available.cache_clear()
+
+        # every test runs with the manager's logger patched out
+        logger_patcher = patch('runtime_dependency_manager.manager.logger')
+        self.mock_logger = logger_patcher.start()
+        self.addCleanup(logger_patcher.stop)
+
+    @patch('runtime_dependency_manager.manager.importlib.import_module', return_value=FakeModule('test_module'))
+    @patch('runtime_dependency_manager.manager.subprocess.Popen', return_value=FakeProcess(0))
+    @patch('runtime_dependency_manager.manager.distributions', return_value=[
+        make_distribution('test_module_a', '1.1'),
+        make_distribution('test_module_b', '3.11.4'),
+        make_distribution('test_module_d', '2.7.2'),
+    ])
+    def test_install_missing_packages(self, mock_distributions, mock_popen, mock_import_module):
+        mock_import_module.side_effect = import_after_install(mock_popen)
         mgr = RuntimeDependencyManager(install_if_missing=True)
         mgr.index_url = "https://pypi.org/simple"
         mgr.extra_index_urls = ["https://extra.index.url"]
@@ -72,7 +129,14 @@ class TestRuntimeDependencyManager(unittest.TestCase):
                 
         packages = [ f'{pkg.name}{pkg.version_spec or ""}' for pkg in mgr.packages if not pkg.optional]
         
-        self.assertEqual(mock_import_module.call_count, 9)
+        # all 9 imports fail before installing; afterwards, test_module_a is only imported once
+        # for both of its 'from' imports, and the missing optional test_module_e isn't retried
+        self.assertEqual(mock_import_module.call_count, 9 + 7)
+
+        # installed packages were verified, and aren't probed for again
+        with patch.object(mgr, '_get_missing_packages') as mock_get_missing_packages:
+            self.assertEqual(mgr.missing_packages, [])
+            mock_get_missing_packages.assert_not_called()
 
         base_command = [
             sys.executable, '-m', 'pip', 'install', 
@@ -81,134 +145,640 @@ class TestRuntimeDependencyManager(unittest.TestCase):
             '--trusted-host', 'https://trusted.host'
         ]
         
-        mock_run.assert_has_calls([
-            call(base_command + [package], capture_output=True, text=True) for package in packages
-        ])
+        mock_popen.assert_called_once_with(
+            base_command + packages, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1, text=True)
         
-    @patch('runtime_dependency_manager.manager.subprocess.run', return_value=subprocess.CompletedProcess((), 0))
-    @patch('runtime_dependency_manager.manager.importlib.import_module', return_value=MagicMock())
-    @patch('runtime_dependency_manager.manager.version', side_effect=['1.0.0'])
-    @patch('runtime_dependency_manager.manager.logger')
-    def test_version_compatibility(self, mock_logger, mock_version, mock_import_module, mock_run):
+    @patch('runtime_dependency_manager.manager.importlib.import_module', return_value=FakeModule('test_module'))
+    @patch('runtime_dependency_manager.manager.subprocess.Popen', return_value=FakeProcess(0))
+    @patch('runtime_dependency_manager.manager.distributions', return_value=[make_distribution('test_module', '1.0.0')])
+    def test_version_compatibility(self, mock_distributions, mock_popen, mock_import_module):
+        mock_import_module.side_effect = import_after_install(mock_popen)
         with self.assertRaises(VersionCompatibilityError):
             with RuntimeDependencyManager(install_if_missing=True) as mgr:
                 with mgr.package('test_module', '>=3.11.4, <4.0.0') as pkg:
                     pkg.import_module('test_module')
 
-    @patch('runtime_dependency_manager.manager.subprocess.run', return_value=subprocess.CompletedProcess((), 1, None, 'No matching distribution'))
     @patch('runtime_dependency_manager.manager.importlib.import_module', side_effect=ImportError)
-    @patch('runtime_dependency_manager.manager.version', side_effect=PackageNotFoundError)
-    @patch('runtime_dependency_manager.manager.logger')
-    def test_package_not_found(self, mock_logger, mock_version, mock_import_module, mock_run):
+    @patch('runtime_dependency_manager.manager.subprocess.Popen', return_value=FakeProcess(1, 'No matching distribution'))
+    @patch('runtime_dependency_manager.manager.distributions', return_value=[])
+    def test_package_not_found(self, mock_distributions, mock_popen, mock_import_module):
         with self.assertRaises(DependentPackageNotFoundError):
             with RuntimeDependencyManager(install_if_missing=True) as mgr:
                 with mgr.package('nonexistent_package', '>=1.0') as pkg:
                     pkg.import_module('nonexistent_module')
 
-    @patch('runtime_dependency_manager.manager.logger')
-    def test_package_initialization(self, mock_logger):
+    @patch('runtime_dependency_manager.manager.importlib.import_module', return_value=FakeModule('test_module'))
+    @patch('runtime_dependency_manager.manager.subprocess.Popen')
+    def test_install_without_missing_packages(self, mock_popen, mock_import_module):
+        mgr = RuntimeDependencyManager()
+        mgr.package('test_module_a').import_module('test_module_a')
+        mgr.package('test_module_b').from_module('test_module_b').import_module('test_module_b_sub')
+
+        # everything imports, so nothing is probed for, or installed
+        with patch.object(mgr, '_get_missing_packages') as mock_get_missing_packages:
+            mgr.install()
+            mock_get_missing_packages.assert_not_called()
+
+        mock_popen.assert_not_called()
+        self.assertEqual(mock_import_module.call_count, 2)
+        self.assertEqual(mgr.missing_packages, [])
+
+    def test_missing_packages_cached(self):
+        mgr = RuntimeDependencyManager()
+        mgr.package('test_package').import_module('test_module')
+
+        with patch.object(mgr, '_get_missing_packages', return_value=[]) as mock_get_missing_packages:
+            self.assertEqual(mgr.missing_packages, [])
+            self.assertEqual(mgr.missing_packages, [])
+            self.assertEqual(mock_get_missing_packages.call_count, 1)
+
+            # adding a package invalidates the cache
+            mgr.package('test_package_2')
+            self.assertEqual(mgr.missing_packages, [])
+            self.assertEqual(mock_get_missing_packages.call_count, 2)
+
+    def test_get_missing_packages(self):
+        mgr = RuntimeDependencyManager()
+        self.assertEqual(mgr._get_missing_packages(), [])
+
+        mgr.package('json')
+        missing_a = mgr.package('test_module_a')
+        mgr.package('test_module_b', optional=True)
+        mgr.package('test_package').from_module('json.decoder').import_module('JSONDecoder')
+        missing_c = mgr.package('test_package').import_modules('json', 'test_module_c')
+
+        with patch.object(mgr, '_try_import', wraps=mgr._try_import) as mock_try_import:
+            self.assertEqual(mgr._get_missing_packages(), [missing_a, missing_c])
+            self.mock_logger.warning.assert_called_once_with("Optional module not found: %s", "test_module_b")
+
+            # 'json' is declared twice, but only probed once
+            self.assertEqual(mock_try_import.call_count, 5)
+
+    @patch('runtime_dependency_manager.manager.ThreadPoolExecutor')
+    def test_get_missing_packages_single_import(self, mock_executor):
+        mgr = RuntimeDependencyManager()
+        mgr.package('json')
+        mgr.package('_nonexistent_package_').import_module('_nonexistent_module_')
+
+        # a single import is probed without starting a thread pool
+        self.assertEqual(mgr._get_missing_packages(mgr.packages[1:]), mgr.packages[1:])
+        mock_executor.assert_not_called()
+
+    def test_get_missing_packages_strict_on_calling_thread(self):
+        with tempfile.TemporaryDirectory() as module_dir:
+            # importing the module only works on the main thread
+            with open(os.path.join(module_dir, 'rdm_test_signal_module.py'), 'w') as module_file:
+                module_file.write('import signal\nsignal.signal(signal.SIGINT, signal.default_int_handler)\nname = 1\n')
+
+            with patch.object(sys, 'path', sys.path + [module_dir]):
+                try:
+                    mgr = RuntimeDependencyManager(strict_imports=True)
+                    mgr.package('json')
+                    mgr.package('rdm_test_signal_module').from_module('rdm_test_signal_module').import_module('name')
+                    self.assertEqual(mgr._get_missing_packages(), [])
+                finally:
+                    sys.modules.pop('rdm_test_signal_module', None)
+
+    def test_get_missing_packages_parent_package_on_calling_thread(self):
+        with tempfile.TemporaryDirectory() as module_dir:
+            # importing the parent package only works on the main thread
+            os.mkdir(os.path.join(module_dir, 'rdm_test_signal_package'))
+            with open(os.path.join(module_dir, 'rdm_test_signal_package', '__init__.py'), 'w') as module_file:
+                module_file.write('import signal\nsignal.signal(signal.SIGINT, signal.default_int_handler)\n')
+            with open(os.path.join(module_dir, 'rdm_test_signal_package', 'sub.py'), 'w'):
+                pass
+
+            with patch.object(sys, 'path', sys.path + [module_dir]):
+                try:
+                    mgr = RuntimeDependencyManager()
+                    mgr.package('json')
+                    mgr.package('rdm_test_signal_package').import_module('rdm_test_signal_package.sub')
+                    self.assertEqual(mgr._get_missing_packages(), [])
+                finally:
+                    sys.modules.pop('rdm_test_signal_package', None)
+
+    def test_is_module_available_parent_package_error(self):
+        with tempfile.TemporaryDirectory() as module_dir:
+            # errors raised by a parent package's code make its submodules unavailable
+            os.mkdir(os.path.join(module_dir, 'rdm_test_broken_package'))
+            with open(os.path.join(module_dir, 'rdm_test_broken_package', '__init__.py'), 'w') as module_file:
+                module_file.write('raise ValueError("broken")\n')
+            with open(os.path.join(module_dir, 'rdm_test_broken_package', 'sub.py'), 'w'):
+                pass
+
+            with patch.object(sys, 'path', sys.path + [module_dir]):
+                self.assertFalse(_is_module_available('rdm_test_broken_package.sub'))
+
+        # modules imported without a __spec__ are available
+        with patch.dict(sys.modules, {'rdm_test_spec_package': types.ModuleType('rdm_test_spec_package')}):
+            sys.modules['rdm_test_spec_package.sub'] = types.ModuleType('rdm_test_spec_package.sub')
+            with patch('runtime_dependency_manager.manager.importlib.util.find_spec', side_effect=ValueError):
+                self.assertTrue(_is_module_available('rdm_test_spec_package.sub'))
+
+    def test_get_missing_packages_cached_on_disk(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            mgr = RuntimeDependencyManager(cache_dir=cache_dir)
+            mgr.package('json')
+            self.assertEqual(mgr._get_missing_packages(), [])
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+            mgr = RuntimeDependencyManager(cache_dir=cache_dir)
+            mgr.package('json')
+            with patch.object(mgr, '_try_import') as mock_try_import:
+                self.assertEqual(mgr._get_missing_packages(), [])
+                mock_try_import.assert_not_called()
+
+            # changes to the environment invalidate the cache
+            with patch('runtime_dependency_manager.manager._get_path_mtimes', return_value=[0]):
+                with patch.object(mgr, '_try_import', return_value=True) as mock_try_import:
+                    self.assertEqual(mgr._get_missing_packages(), [])
+                    mock_try_import.assert_called_once()
+
+            # missing packages aren't cached
+            mgr = RuntimeDependencyManager(cache_dir=cache_dir)
+            mgr.package('_nonexistent_package_')
+            self.assertEqual(len(mgr._get_missing_packages()), 1)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+    def test_get_missing_packages_cached_on_disk_per_sys_path(self):
+        with tempfile.TemporaryDirectory() as cache_dir, tempfile.TemporaryDirectory() as extra_dir:
+            with open(os.path.join(extra_dir, 'rdm_test_extra_module.py'), 'w'):
+                pass
+
+            # found through an extra sys.path entry (e.g., PYTHONPATH), and cached
+            with patch.object(sys, 'path', sys.path + [extra_dir]):
+                mgr = RuntimeDependencyManager(cache_dir=cache_dir)
+                mgr.package('rdm_test_extra_module')
+                self.assertEqual(mgr._get_missing_packages(), [])
+
+            # a later run without that entry doesn't use the cache
+            _is_module_available.cache_clear()
+            mgr = RuntimeDependencyManager(cache_dir=cache_dir)
+            mgr.package('rdm_test_extra_module')
+            self.assertEqual(mgr._get_missing_packages(), mgr.packages)
+
+            # nor does a run after the entry's contents changed
+            with patch.object(sys, 'path', sys.path + [extra_dir]):
+                _is_module_available.cache_clear()
+                mgr = RuntimeDependencyManager(cache_dir=cache_dir)
+                mgr.package('rdm_test_extra_module')
+                os.remove(os.path.join(extra_dir, 'rdm_test_extra_module.py'))
+                os.utime(extra_dir, ns=(0, 0))
+                importlib.invalidate_caches()
+                self.assertEqual(mgr._get_missing_packages(), mgr.packages)
+
+    def test_cache_dir_expanded(self):
+        mgr = RuntimeDependencyManager(cache_dir='~/.cache/runtime_dependency_manager')
+        self.assertEqual(mgr.cache_dir, os.path.join(os.path.expanduser('~'), '.cache', 'runtime_dependency_manager'))
+        self.assertIsNone(RuntimeDependencyManager().cache_dir)
+
+    def test_install_writes_probe_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            mgr = RuntimeDependencyManager(cache_dir=cache_dir)
+            pkg = mgr.package('json')
+            mgr._missing_packages_cache = [pkg]
+
+            with patch.object(mgr, '_install_missing_packages') as mock_install:
+                mgr.install()
+
+            mock_install.assert_called_once_with([pkg])
+            self.assertTrue(mgr._is_probe_cache_valid())
+
+            # packages that still can't be imported after installing aren't recorded as available
+            mgr = RuntimeDependencyManager(cache_dir=cache_dir)
+            pkg = mgr.package('test_package').import_module('_nonexistent_module_')
+            mgr._missing_packages_cache = [pkg]
+
+            with patch.object(mgr, '_install_missing_packages'):
+                mgr.install()
+
+            self.assertFalse(mgr._is_probe_cache_valid())
+
+    def test_find_unavailable_package(self):
+        mgr = RuntimeDependencyManager()
+        packages = [Package('test_module_a', '>=1.0'), Package('Test_Module.B', '>=2.0')]
+
+        output = 'ERROR: No matching distribution found for test-module-b>=2.0'
+        self.assertEqual(mgr._find_unavailable_package(packages, output), 'Test_Module.B')
+
+        output = 'ERROR: No matching distribution'
+        self.assertEqual(mgr._find_unavailable_package(packages, output), 'test_module_a, Test_Module.B')
+
+    @patch('runtime_dependency_manager.manager.PIP_OUTPUT_TAIL_LINES', 2)
+    def test_run_pip(self):
+        mgr = RuntimeDependencyManager()
+        output = 'Collecting test_module\nDownloading test_module\nInstalled test_module\n'
+
+        with patch('runtime_dependency_manager.manager.subprocess.Popen', return_value=FakeProcess(0, output)):
+            result = mgr._run_pip(['pip', 'install', 'test_module'])
+
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.stdout, 'Downloading test_module\nInstalled test_module')
+        self.assertEqual(self.mock_logger.debug.call_count, 3)
+
+    @patch('runtime_dependency_manager.manager.importlib.import_module', return_value=FakeModule('test_module'))
+    @patch('runtime_dependency_manager.manager.subprocess.Popen', return_value=FakeProcess(0))
+    @patch('runtime_dependency_manager.manager.distributions', return_value=[
+        make_distribution('test_module_a', '1.1'),
+        make_distribution('test_module_b', '2.0'),
+    ])
+    def test_install_all(self, mock_distributions, mock_popen, mock_import_module):
+        mgr_1 = RuntimeDependencyManager()
+        mgr_1.package('test_module_a', '>=1.1').import_module('test_module_a')
+
+        mgr_2 = RuntimeDependencyManager()
+        mgr_2.package('test_module_a', '>=1.1').import_module('test_module_a')
+        mgr_2.package('test_module_b', '>=2.0').import_module('test_module_b')
+
+        RuntimeDependencyManager.install_all(mgr_1, mgr_2)
+
+        mock_popen.assert_called_once_with(
+            [sys.executable, '-m', 'pip', 'install', 'test_module_a>=1.1', 'test_module_b>=2.0'],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1, text=True)
+        self.assertEqual(mock_import_module.call_count, 3)
+        self.assertEqual(mgr_1.missing_packages, [])
+        self.assertEqual(mgr_2.missing_packages, [])
+
+    @patch('runtime_dependency_manager.manager.subprocess.Popen', side_effect=[FakeProcess(0), FakeProcess(0)])
+    @patch('runtime_dependency_manager.manager.distributions', return_value=[
+        make_distribution('test_module_a', '1.0'),
+        make_distribution('test_module_b', '1.0'),
+        make_distribution('test_module_c', '1.0'),
+    ])
+    def test_install_missing_packages_concurrently(self, mock_distributions, mock_popen):
+        mgr = RuntimeDependencyManager(install_workers=2)
+        packages = [mgr.package(name, '>=1.0') for name in ('test_module_a', 'test_module_b', 'test_module_c')]
+
+        mgr._install_missing_packages(packages)
+
+        commands = sorted(args[0] for args, kwargs in mock_popen.call_args_list)
+        self.assertEqual(commands, [
+            [sys.executable, '-m', 'pip', 'install', 'test_module_a>=1.0', 'test_module_c>=1.0'],
+            [sys.executable, '-m', 'pip', 'install', 'test_module_b>=1.0'],
+        ])
+
+    @patch('runtime_dependency_manager.manager.subprocess.Popen', side_effect=[FakeProcess(0), FakeProcess(1)])
+    def test_install_missing_packages_concurrently_error(self, mock_popen):
+        mgr = RuntimeDependencyManager(install_workers=2)
+        packages = [mgr.package(name, '>=1.0') for name in ('test_module_a', 'test_module_b')]
+
+        with self.assertRaises(PackageInstallationError):
+            mgr._install_missing_packages(packages)
+
+    @patch('runtime_dependency_manager.manager.requires')
+    def test_shard_packages_keeps_dependent_packages_together(self, mock_requires):
+        def requires(name):
+            if name == 'test_module_a':
+                return ['test-module-c>=1.0', 'unrelated; extra == "test"']
+            raise PackageNotFoundError(name)
+
+        mock_requires.side_effect = requires
+        mgr = RuntimeDependencyManager(install_workers=2)
+        a, b, c = [mgr.package(name) for name in ('test_module_a', 'test_module_b', 'test_module_c')]
+
+        self.assertEqual(mgr._shard_packages([a, b, c], 2), [[a, c], [b]])
+        self.assertEqual(mgr._shard_packages([b, c, a], 2), [[c, a], [b]])
+
+    @patch('runtime_dependency_manager.manager.subprocess.Popen')
+    @patch('runtime_dependency_manager.manager.distributions')
+    def test_install_no_packages(self, mock_distributions, mock_popen):
+        mgr = RuntimeDependencyManager()
+        with patch.object(mgr, '_get_pip_install_command') as mock_get_pip_install_command:
+            mgr._install_missing_packages([])
+            mock_get_pip_install_command.assert_not_called()
+
+        mock_popen.assert_not_called()
+        mock_distributions.assert_not_called()
+
+    def test_get_pip_install_command(self):
+        mgr = RuntimeDependencyManager()
+        self.assertEqual(mgr._get_pip_install_command(), [sys.executable, '-m', 'pip', 'install'])
+
+        mgr = RuntimeDependencyManager(
+            index_url='https://pypi.org/simple',
+            extra_index_urls=['https://extra.index.url/1', 'https://extra.index.url/2'],
+            trusted_hosts=['trusted.host'],
+            find_links=['/tmp/wheelhouse'])
+        self.assertEqual(mgr._get_pip_install_command(), [
+            sys.executable, '-m', 'pip', 'install',
+            '--index-url', 'https://pypi.org/simple',
+            '--extra-index-url', 'https://extra.index.url/1',
+            '--extra-index-url', 'https://extra.index.url/2',
+            '--trusted-host', 'trusted.host',
+            '--find-links', '/tmp/wheelhouse'
+        ])
+
+    @patch('runtime_dependency_manager.manager.subprocess.Popen', side_effect=[FakeProcess(1), FakeProcess(0)])
+    @patch('runtime_dependency_manager.manager.distributions', return_value=[make_distribution('test_module', '1.0')])
+    def test_install_missing_packages_prefer_offline(self, mock_distributions, mock_popen):
+        mgr = RuntimeDependencyManager(find_links=['/tmp/wheelhouse'], prefer_offline=True)
+        mgr._install_missing_packages([mgr.package('test_module', '>=1.0')])
+
+        base_command = [sys.executable, '-m', 'pip', 'install', '--find-links', '/tmp/wheelhouse']
+        self.assertEqual([args[0] for args, kwargs in mock_popen.call_args_list], [
+            base_command + ['--no-index', '--no-build-isolation', 'test_module>=1.0'],
+            base_command + ['test_module>=1.0'],
+        ])
+
+    @patch('runtime_dependency_manager.manager.subprocess.Popen', return_value=FakeProcess(0))
+    @patch('runtime_dependency_manager.manager.distributions', return_value=[make_distribution('test_module', '1.0')])
+    def test_install_missing_packages_prefer_offline_without_find_links(self, mock_distributions, mock_popen):
+        mgr = RuntimeDependencyManager(prefer_offline=True)
+        mgr._install_missing_packages([mgr.package('test_module', '>=1.0')])
+
+        mock_popen.assert_called_once()
+        self.assertEqual(mock_popen.call_args[0][0], [sys.executable, '-m', 'pip', 'install', 'test_module>=1.0'])
+
+    def test_package_initialization(self):
         pkg = Package(name='test_package', version_spec='>=1.0', optional=True)
         self.assertEqual(pkg.name, 'test_package')
         self.assertEqual(pkg.version_spec, '>=1.0')
+        self.assertEqual(pkg._requirement, 'test_package>=1.0')
+        self.assertEqual(pkg._canonical, 'test-package')
+        # differently spelled names of the same distribution share a single canonical string
+        self.assertIs(Package(name='Test.Package')._canonical, pkg._canonical)
+
+        # version specifications are normalized
+        self.assertEqual(Package(name='test_package', version_spec='<4.0.0 ,>=3.11.4').version_spec, '<4.0.0,>=3.11.4')
+        self.assertEqual(Package(name='test_package').version_spec, '>0')
+
+        # identical version specifications share their parsed form
+        self.assertIs(Package(name='test_package_2', version_spec='>=1.0')._specifier, pkg._specifier)
         self.assertTrue(pkg.optional)
         self.assertEqual(pkg.imports, [])
 
-    @patch('runtime_dependency_manager.manager.logger')
-    def test_import_statements(self, mock_logger):
+    def test_import_statements(self):
         pkg = Package(name='test_package')
         pkg.import_module('test_module')
         pkg.from_module('test_from').import_module('test_import')
 
         self.assertEqual(pkg.imports, [
-            {'type': 'import', 'module': 'test_module'},
-            {'type': 'from', 'from': 'test_from', 'module': 'test_import'}
+            ImportSpec('import', 'test_module'),
+            ImportSpec('from', 'test_import', from_name='test_from')
         ])
 
-    @patch('runtime_dependency_manager.manager.logger')
-    def test_as_module(self, mock_logger):
+    def test_import_multiple_statements(self):
+        pkg = Package(name='test_package')
+        self.assertIs(pkg.import_modules('test_module_1', 'test_module_2'), pkg)
+        self.assertIs(pkg.from_module('test_from').import_modules('test_import_1', 'test_import_2'), pkg)
+
+        self.assertEqual(pkg.imports, [
+            ImportSpec('import', 'test_module_1'),
+            ImportSpec('import', 'test_module_2'),
+            ImportSpec('from', 'test_import_1', from_name='test_from'),
+            ImportSpec('from', 'test_import_2', from_name='test_from')
+        ])
+
+    def test_import_names_interned(self):
+        pkg = Package('test_package')
+        pkg.import_module(''.join(['test', '_module']))
+        pkg.from_module(''.join(['test', '_from'])).import_module(''.join(['test', '_name']))
+
+        self.assertIs(pkg.imports[0].module, sys.intern('test_module'))
+        self.assertIs(pkg.imports[1].from_name, sys.intern('test_from'))
+        self.assertIs(pkg.imports[1].module, sys.intern('test_name'))
+
+    def test_import_spec(self):
+        imp = ImportSpec('import', 'test_module')
+        self.assertEqual((imp.source_module, imp.bound_name), ('test_module', 'test_module'))
+
+        imp = ImportSpec('import', 'test_module.test_sub')
+        self.assertEqual((imp.source_module, imp.bound_name), ('test_module.test_sub', 'test_module'))
+
+        imp = ImportSpec('import', 'test_module.test_sub', alias='test_alias')
+        self.assertEqual((imp.source_module, imp.bound_name), ('test_module.test_sub', 'test_alias'))
+
+        imp = ImportSpec('from', 'test_module', from_name='test_from', alias='test_alias')
+        self.assertEqual((imp.source_module, imp.bound_name), ('test_from', 'test_alias'))
+
+        # import statements are plain tuples, without a per-instance __dict__
+        self.assertFalse(hasattr(imp, '__dict__'))
+        with self.assertRaises(AttributeError):
+            imp.alias = 'test_alias_2'
+
+    def test_as_module(self):
         pkg = Package(name='test_package')
         pkg.import_module('test_module').as_module('test_alias')
 
         self.assertEqual(pkg.imports, [
-            {'type': 'import', 'module': 'test_module', 'alias': 'test_alias'}
+            ImportSpec('import', 'test_module', alias='test_alias')
         ])
 
-    @patch('runtime_dependency_manager.manager.subprocess.run', return_value=subprocess.CompletedProcess((), 1, None, ''))
-    @patch('runtime_dependency_manager.manager.importlib.import_module', return_value=MagicMock())
-    @patch('runtime_dependency_manager.manager.version', side_effect=['1.0.0'])
-    @patch('runtime_dependency_manager.manager.logger')
-    def test_package_installation_error(self, mock_logger, mock_version, mock_import_module, mock_run):
+    @patch('runtime_dependency_manager.manager.importlib.import_module', return_value=FakeModule('test_module'))
+    @patch('runtime_dependency_manager.manager.subprocess.Popen', return_value=FakeProcess(1))
+    @patch('runtime_dependency_manager.manager.distributions', return_value=[])
+    def test_package_installation_error(self, mock_distributions, mock_popen, mock_import_module):
+        mock_import_module.side_effect = import_after_install(mock_popen)
         with self.assertRaises(PackageInstallationError):
             with RuntimeDependencyManager(install_if_missing=True) as mgr:
                 with mgr.package('test_module', '>=3.11.4, <4.0.0') as pkg:
                     pkg.import_module('test_module')
 
-    @patch('runtime_dependency_manager.manager.importlib.import_module', return_value=MagicMock())
-    @patch('builtins.globals', return_value={})
-    @patch('builtins.exec', MagicMock())
-    @patch('runtime_dependency_manager.manager.logger')
-    def test_are_imports_available(self, mock_logger, mock_globals, mock_import_module):
+    @patch('runtime_dependency_manager.manager.importlib.import_module', return_value=FakeModule('test_module'))
+    @patch('runtime_dependency_manager.manager.importlib.util.find_spec', return_value=types.SimpleNamespace())
+    def test_are_imports_available(self, mock_find_spec, mock_import_module):
         with RuntimeDependencyManager(True) as mgr:
             with mgr.package('test_package') as pkg:
                 pkg.import_module('test_module')
         self.assertTrue(mgr._are_imports_available(pkg))
 
-    @patch('runtime_dependency_manager.manager.logger')
-    @patch('builtins.globals', return_value={})
-    @patch('builtins.exec', MagicMock())
-    def test_try_import(self, mock_globals, mock_logger):
+    def test_are_imports_available_without_imports(self):
         mgr = RuntimeDependencyManager()
+        self.assertTrue(mgr._are_imports_available(Package('json')))
+        self.assertFalse(mgr._are_imports_available(Package('_nonexistent_package_')))
 
-        # Test import with alias
-        imp = {'type': 'import', 'module': 'test_module', 'alias': 'test_alias'}
-        with patch('runtime_dependency_manager.manager.importlib.import_module', return_value=MagicMock()):
+        # stops probing at the first unavailable import
+        pkg = Package('test_package').import_modules('test_module_1', 'test_module_2')
+        with patch.object(mgr, '_try_import', return_value=False) as mock_try_import:
+            self.assertFalse(mgr._are_imports_available(pkg))
+            mock_try_import.assert_called_once_with(ImportSpec('import', 'test_module_1'))
+
+    def test_try_import(self):
+        mgr = RuntimeDependencyManager()
+
+        with patch('runtime_dependency_manager.manager.importlib.util.find_spec', return_value=types.SimpleNamespace()) as mock_find_spec:
+            # Test import with alias
+            imp = ImportSpec('import', 'test_module', alias='test_alias')
             self.assertTrue(mgr._try_import(imp))
-            exec.assert_any_call(f"import test_module as test_alias", mock_globals.return_value)
+            mock_find_spec.assert_called_with('test_module')
 
-        # Test from import with alias
-        imp = {'type': 'from', 'from': 'test_from', 'module': 'test_module', 'alias': 'test_alias'}
-        with patch('runtime_dependency_manager.manager.importlib.import_module', return_value=MagicMock()):
+            # Test from import with alias
+            imp = ImportSpec('from', 'test_module', from_name='test_from', alias='test_alias')
             self.assertTrue(mgr._try_import(imp))
-            exec.assert_any_call(f"from test_from import test_module as test_alias", mock_globals.return_value)
+            mock_find_spec.assert_called_with('test_from')
+
+        # Test missing module and missing parent package
+        _is_module_available.cache_clear()
+        with patch('runtime_dependency_manager.manager.importlib.util.find_spec', return_value=None):
+            self.assertFalse(mgr._try_import(ImportSpec('import', 'test_module')))
+        with patch('runtime_dependency_manager.manager.importlib.util.find_spec', side_effect=ModuleNotFoundError):
+            self.assertFalse(mgr._try_import(ImportSpec('import', 'test_package.test_module')))
+
+        # Test that real modules are located
+        self.assertTrue(mgr._try_import(ImportSpec('import', 'json')))
+        self.assertTrue(mgr._try_import(ImportSpec('from', 'JSONDecoder', from_name='json.decoder')))
+        self.assertFalse(mgr._try_import(ImportSpec('import', '_nonexistent_package_.module')))
+
+    @patch('runtime_dependency_manager.manager.importlib.util.find_spec')
+    def test_try_import_already_imported(self, mock_find_spec):
+        mgr = RuntimeDependencyManager()
+        self.assertTrue(mgr._try_import(ImportSpec('import', 'json')))
+        self.assertTrue(mgr._try_import(ImportSpec('from', 'JSONDecoder', from_name='json')))
+
+        with patch.dict(sys.modules, {'test_blocked_module': None}):
+            self.assertFalse(mgr._try_import(ImportSpec('import', 'test_blocked_module')))
+
+        mock_find_spec.assert_not_called()
+
+    def test_try_import_strict(self):
+        mgr = RuntimeDependencyManager(strict_imports=True)
 
-    @patch('runtime_dependency_manager.manager.logger')
-    @patch('runtime_dependency_manager.manager.inspect.currentframe', return_value=MagicMock())
-    @patch('builtins.exec', MagicMock())
-    def test_import_module(self, mock_currentframe, mock_logger):
+        self.assertTrue(mgr._try_import(ImportSpec('import', 'json')))
+        self.assertTrue(mgr._try_import(ImportSpec('from', 'JSONDecoder', from_name='json.decoder')))
+        self.assertTrue(mgr._try_import(ImportSpec('from', 'decoder', from_name='json')))
+        self.assertFalse(mgr._try_import(ImportSpec('from', '_nonexistent_name_', from_name='json')))
+        self.assertFalse(mgr._try_import(ImportSpec('from', 'test_module', from_name='_nonexistent_package_')))
+
+    def test_try_import_memoized(self):
+        mgr = RuntimeDependencyManager()
+
+        with patch('runtime_dependency_manager.manager.importlib.util.find_spec', return_value=types.SimpleNamespace()) as mock_find_spec:
+            self.assertTrue(mgr._try_import(ImportSpec('import', 'test_module')))
+            self.assertTrue(mgr._try_import(ImportSpec('from', 'test_sub_1', from_name='test_module')))
+            self.assertTrue(mgr._try_import(ImportSpec('from', 'test_sub_2', from_name='test_module')))
+            mock_find_spec.assert_called_once_with('test_module')
+
+            _is_module_available.cache_clear()
+            self.assertTrue(mgr._try_import(ImportSpec('import', 'test_module')))
+            self.assertEqual(mock_find_spec.call_count, 2)
+
+    @patch('builtins.exec')
+    def test_import_module(self, mock_exec):
         mock_globals = {'__name__': '__main__'}
-        mock_currentframe.return_value.f_back.f_globals = mock_globals
 
         mgr = RuntimeDependencyManager()
+        self.assertIs(mgr.caller_globals, globals())
+        mgr.caller_globals = mock_globals
 
         # Test import with alias
-        imp = {'type': 'import', 'module': 'test_module', 'alias': 'test_alias'}
-        with patch('runtime_dependency_manager.manager.importlib.import_module', return_value=MagicMock()):
+        imp = ImportSpec('import', 'test_module', alias='test_alias')
+        with patch('runtime_dependency_manager.manager.importlib.import_module', return_value=FakeModule('test_module')) as mock_import_module:
             mgr._import_module(Package('module'), imp)
             self.assertIn('test_alias', mock_globals)
+            mock_import_module.assert_called_once_with('test_module')
 
         # Test from import with alias
-        imp = {'type': 'from', 'from': 'test_from', 'module': 'test_module', 'alias': 'test_alias'}
-        with patch('runtime_dependency_manager.manager.importlib.import_module', return_value=MagicMock()):
+        imp = ImportSpec('from', 'test_module', from_name='test_from', alias='test_alias')
+        with patch('runtime_dependency_manager.manager.importlib.import_module', return_value=FakeModule('test_module')):
             mgr._import_module(Package('test_from'), imp)
             self.assertIn('test_alias', mock_globals)
 
-    @patch('runtime_dependency_manager.manager.logger')
-    @patch('runtime_dependency_manager.manager.inspect.currentframe', return_value=MagicMock())
+        # imports are bound directly, without generating and executing source code
+        mock_exec.assert_not_called()
+
+    @patch('runtime_dependency_manager.manager.importlib.import_module')
+    def test_import_module_already_imported(self, mock_import_module):
+        mgr = RuntimeDependencyManager()
+        mgr.caller_globals = {}
+
+        mgr._import_module(Package('json'), ImportSpec('from', 'JSONDecoder', from_name='json', alias='Decoder'))
+        self.assertIs(mgr.caller_globals['Decoder'], sys.modules['json'].JSONDecoder)
+        mock_import_module.assert_not_called()
+
+    @patch('runtime_dependency_manager.manager.importlib.import_module', return_value=FakeModule('test_module'))
+    def test_import_all_modules_concurrently(self, mock_import_module):
+        mgr = RuntimeDependencyManager(import_workers=4)
+        mgr.caller_globals = {}
+        mgr.package('test_package_a').import_modules('test_module_a', 'test_module_a.sub')
+        mgr.package('test_package_b').from_module('test_module_b').import_module('test_name')
+        mgr.package('test_package_c').import_module('json')
+
+        with patch.object(mgr, '_preimport_group', wraps=mgr._preimport_group) as mock_preimport_group:
+            self.assertEqual(mgr._import_all_modules(), [])
+
+        # modules already imported aren't imported again, and submodules are imported
+        # along with their top-level package
+        self.assertCountEqual(
+            [list(args[0]) for args, kwargs in mock_preimport_group.call_args_list],
+            [['test_module_a', 'test_module_a.sub'], ['test_module_b']])
+        self.assertEqual(sorted(mgr.caller_globals), ['json', 'test_module_a', 'test_name'])
+
+    def test_import_unavailable_optional_package(self):
+        mgr = RuntimeDependencyManager()
+        mgr.caller_globals = {'test_fallback': None}
+        with mgr.package('test_package', optional=True) as pkg:
+            pkg.import_module('test_module')
+            pkg.import_module('json').as_module('test_json')
+            pkg.import_module('test_fallback')
+            pkg.from_module('test_module').import_module('test_name')
+
+        self.assertEqual(mgr.missing_packages, [])
+        self.assertEqual(mgr._import_all_modules(), [])
+
+        # 'from' imports aren't bound, nor are names the caller already bound
+        self.assertEqual(sorted(mgr.caller_globals), ['test_fallback', 'test_json', 'test_module'])
+        self.assertIsNone(mgr.caller_globals['test_fallback'])
+
+        # modules are imported on first use; unavailable ones are falsy, and aren't imported
+        # again on every use
+        with patch('runtime_dependency_manager.manager.importlib.import_module', wraps=importlib.import_module) as mock_import_module:
+            self.assertFalse(mgr.caller_globals['test_module'])
+            with self.assertRaises(ImportError):
+                mgr.caller_globals['test_module'].test_attribute
+            with self.assertRaises(ImportError):
+                mgr.caller_globals['test_module'].test_attribute
+            mock_import_module.assert_called_once_with('test_module')
+        self.assertTrue(mgr.caller_globals['test_json'])
+
+        # introspecting a placeholder doesn't import its module
+        placeholder = mgr.caller_globals['test_module']
+        self.assertFalse(hasattr(placeholder, '__wrapped__'))
+        self.assertIsNone(getattr(placeholder, '__test__', None))
+        placeholder_copy = copy.copy(placeholder)
+        self.assertEqual(repr(placeholder_copy), repr(placeholder))
+        with self.assertRaises(ImportError):
+            placeholder_copy.test_attribute
+        self.assertIs(mgr.caller_globals['test_json'].loads, sys.modules['json'].loads)
+
+    def test_caller_globals(self):
+        # entering the manager through another module (e.g., contextlib) doesn't change
+        # where imports are bound
+        with contextlib.ExitStack() as stack:
+            mgr = stack.enter_context(RuntimeDependencyManager())
+            self.assertIs(mgr.caller_globals, globals())
+
+        # a helper creating a manager on behalf of another module passes the globals explicitly
+        helper_globals = {'RuntimeDependencyManager': RuntimeDependencyManager}
+        target_globals: dict = {}
+        mgr = eval('RuntimeDependencyManager(caller_globals=target_globals)', helper_globals, {'target_globals': target_globals})
+        self.assertIs(mgr.caller_globals, target_globals)
+
+    def test_import_submodule(self):
+        mgr = RuntimeDependencyManager()
+        mgr.caller_globals = {}
+
+        # like 'import xml.dom', the top-level package is bound
+        self.assertTrue(mgr._import_module(Package('xml'), ImportSpec('import', 'xml.dom')))
+        self.assertEqual(mgr.caller_globals, {'xml': sys.modules['xml']})
+
+        # like 'import xml.dom as dom', the submodule itself is bound
+        self.assertTrue(mgr._import_module(Package('xml'), ImportSpec('import', 'xml.dom', alias='dom')))
+        self.assertIs(mgr.caller_globals['dom'], sys.modules['xml.dom'])
+
     @patch('runtime_dependency_manager.manager.importlib.import_module', side_effect=ImportError())
-    @patch('builtins.exec', MagicMock())
-    def test_import_module_errors(self, mock_im, mock_currentframe, mock_logger):
+    def test_import_module_errors(self, mock_im):
         mock_globals = {'__name__': '__main__'}
-        mock_currentframe.return_value.f_back.f_globals = mock_globals
 
         mgr = RuntimeDependencyManager()
+        mgr.caller_globals = mock_globals
 
         # Test failed import with alias
-        imp = {'type': 'import', 'module': 'test_module', 'alias': 'test_alias'}
+        imp = ImportSpec('import', 'test_module', alias='test_alias')
         mgr._import_module(Package('module'), imp)
         self.assertRaises(ImportError)
 
         # Test failed from import with alias
-        imp = {'type': 'from', 'from': 'test_from', 'module': 'test_module', 'alias': 'test_alias'}
+        imp = ImportSpec('from', 'test_module', from_name='test_from', alias='test_alias')
         mgr._import_module(Package('test_from'), imp)
         self.assertRaises(ImportError)
 
@@ -216,15 +786,72 @@ class TestRuntimeDependencyManager(unittest.TestCase):
             pass
         
         test_from = types.ModuleType('test_from')
-        with patch('runtime_dependency_manager.manager.importlib.import_module', return_value=test_from):
-            # Test failed import with alias
-            imp = {'type': 'from', 'from': 'test_from', 'module': 'test_module', 'alias': 'test_alias'}
-            mgr._import_module(Package('module'), imp)
-            self.assertRaises(AttributeError)
+        mock_im.side_effect = None
+        mock_im.return_value = test_from
+
+        # Test failed import with alias
+        imp = ImportSpec('from', 'test_module', from_name='test_from', alias='test_alias')
+        mgr._import_module(Package('module'), imp)
+        self.assertRaises(AttributeError)
             
+    @patch('runtime_dependency_manager.manager.distributions', return_value=[
+        make_distribution('Test_Package', '1.0.0'),
+        make_distribution('test-package', '2.0.0'),
+        make_distribution(None, '3.0.0'),
+    ])
+    def test_get_installed_versions(self, mock_distributions):
+        mgr = RuntimeDependencyManager()
+        self.assertEqual(mgr._get_installed_versions(), {'test-package': '1.0.0'})
+
+    def test_get_installed_versions_from_dist_info_names(self):
+        with tempfile.TemporaryDirectory() as site_dir:
+            # the version is taken from the directory name, without reading METADATA
+            os.mkdir(os.path.join(site_dir, 'test_package-1.2.0.dist-info'))
+            # directory names that can't be parsed fall back to METADATA
+            os.mkdir(os.path.join(site_dir, 'other_package.egg-info'))
+            with open(os.path.join(site_dir, 'other_package.egg-info', 'PKG-INFO'), 'w') as metadata:
+                metadata.write('Metadata-Version: 2.1\nName: Other.Package\nVersion: 3.0\n')
+
+            with patch('runtime_dependency_manager.manager.distributions', return_value=list(distributions(path=[site_dir]))):
+                mgr = RuntimeDependencyManager()
+                self.assertEqual(mgr._get_installed_versions(), {'test-package': '1.2.0', 'other-package': '3.0'})
+
+    def test_parse_dist_info_name(self):
+        self.assertEqual(_parse_dist_info_name(Path('test_package-1.2.0.dist-info')), ('test_package', '1.2.0'))
+        self.assertEqual(_parse_dist_info_name(Path('test_package-1.2.0+local.dist-info')), ('test_package', '1.2.0+local'))
+        self.assertEqual(_parse_dist_info_name(Path('test_package.dist-info')), (None, None))
+        self.assertEqual(_parse_dist_info_name(Path('test-package-1.2.0.dist-info')), (None, None))
+        self.assertEqual(_parse_dist_info_name(Path('test_package-unknown.dist-info')), (None, None))
+        self.assertEqual(_parse_dist_info_name(Path('test_package-1.2.0.egg-info')), (None, None))
+        self.assertEqual(_parse_dist_info_name(None), (None, None))
+
+    @patch('runtime_dependency_manager.manager.distributions', return_value=[])
+    def test_check_version_compatibility_not_installed(self, mock_distributions):
+        mgr = RuntimeDependencyManager()
+        with self.assertRaises(DependentPackageNotFoundError):
+            mgr._check_version_compatibility(Package('test_package', '>=1.0'))
+
+        # an explicit snapshot is used as is
+        mgr._check_version_compatibility(Package('Test_Package', '>=1.0'), {'test-package': '1.0'})
+        with self.assertRaises(VersionCompatibilityError):
+            mgr._check_version_compatibility(Package('Test_Package', '>=2.0'), {'test-package': '1.0'})
+        mock_distributions.assert_called_once()
+
     def test_is_version_satisfying(self):
         mgr = RuntimeDependencyManager()
         self.assertTrue(mgr._is_version_satisfying('1.0.0', None))
 
+        pkg = Package('test_package', '>=3.11.4, <4.0.0')
+        self.assertTrue(mgr._is_version_satisfying('3.11.4', pkg._specifier))
+        self.assertFalse(mgr._is_version_satisfying('4.0.0', pkg._specifier))
+        self.assertTrue(mgr._is_version_satisfying('3.12.0b1', pkg._specifier))
+
+        pkg = Package('test_package', '==2.7.2')
+        with patch('runtime_dependency_manager.manager._parse_version', wraps=_parse_version) as mock_parse_version:
+            self.assertTrue(mgr._is_version_satisfying('2.7.2', pkg._specifier))
+            mock_parse_version.assert_not_called()
+            self.assertTrue(mgr._is_version_satisfying('2.7.2.0', pkg._specifier))
+            self.assertFalse(mgr._is_version_satisfying('2.7.3', pkg._specifier))
+
 if __name__ == '__main__':
     unittest.main()